@@ -0,0 +1,119 @@
+"""Tests for performance_regression_check.py
+
+Run with:
+    python -m unittest discover scripts
+"""
+
+import io
+import sys
+import unittest
+from contextlib import redirect_stdout
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+
+from performance_regression_check import PerformanceMetrics, PerformanceRegression
+
+
+class ParseTestOutputTest(unittest.TestCase):
+    def setUp(self):
+        self.checker = PerformanceRegression()
+
+    def parse(self, *lines):
+        return self.checker._parse_test_output(lines)
+
+    def test_metric_lines(self):
+        metrics = self.parse(
+            "Cold start time: 312.456ms",
+            "Warm start time: 87.1µs",
+            "Idle memory usage: 31.5 MB",
+            "Binary size: 4.2 MB",
+        )
+        self.assertAlmostEqual(metrics.cold_start_ms, 312.456)
+        self.assertAlmostEqual(metrics.warm_start_ms, 0.0871)
+        self.assertEqual(metrics.memory_usage_mb, 31.5)
+        self.assertEqual(metrics.binary_size_mb, 4.2)
+
+    def test_single_threaded_libtest_prefix(self):
+        # With one test thread libtest prints the test name first and the
+        # test's println continues on the same line
+        metrics = self.parse(
+            "test performance::startup::tests::test_cold_start ... Cold start time: 123.456ms",
+            "test performance::startup::tests::test_warm_start ... Warm start time: 56µs",
+        )
+        self.assertAlmostEqual(metrics.cold_start_ms, 123.456)
+        self.assertAlmostEqual(metrics.warm_start_ms, 0.056)
+
+    def test_suffix_lines(self):
+        metrics = self.parse(
+            "test performance::file_search::tests::test_search ... Searched 100000 files in 42.5ms",
+            "Git status found in 3ms",
+            "Syntax highlighting processed 200000 lines (10.00MB) with 5000 tokens in 950ns",
+            "Incremental highlighting processed 100 tokens in 3ms",
+        )
+        self.assertEqual(metrics.file_search_ms, 42.5)
+        self.assertEqual(metrics.git_status_ms, 3.0)
+        self.assertAlmostEqual(metrics.syntax_highlight_ms, 0.00095)
+
+    def test_indented_line(self):
+        metrics = self.parse("  Cold start time: 9ms")
+        self.assertEqual(metrics.cold_start_ms, 9.0)
+
+    def test_malformed_value_is_skipped(self):
+        metrics = self.parse("Cold start time: 5min", "Idle memory usage: n/a")
+        self.assertIsNone(metrics.cold_start_ms)
+        self.assertIsNone(metrics.memory_usage_mb)
+
+
+class ExtractMillisecondsTest(unittest.TestCase):
+    def setUp(self):
+        self.checker = PerformanceRegression()
+
+    def test_units(self):
+        cases = {
+            "1.5s": 1500.0,
+            "3ms": 3.0,
+            "7 µs": 0.007,
+            "4us": 0.004,
+            "250ns": 0.00025,
+            "Duration::2ms": 2.0,
+            "12": 12000.0,
+        }
+        for text, expected in cases.items():
+            with self.subTest(text=text):
+                self.assertAlmostEqual(self.checker._extract_milliseconds(text), expected)
+
+    def test_trailing_text_is_rejected(self):
+        for text in ("5min", "1.2.3ms", "12.5 MB", "abc", ""):
+            with self.subTest(text=text):
+                self.assertIsNone(self.checker._extract_milliseconds(text))
+
+
+
+class GenerateReportTest(unittest.TestCase):
+    def report(self, baseline):
+        out = io.StringIO()
+        with redirect_stdout(out):
+            PerformanceRegression().generate_report(
+                PerformanceMetrics(cold_start_ms=100.0), baseline
+            )
+        return out.getvalue()
+
+    def test_no_baseline(self):
+        self.assertNotIn("Regression Analysis", self.report(None))
+
+    def test_baseline_without_known_metrics(self):
+        # An empty or fully renamed baseline must not silently skip analysis
+        for baseline in ({}, {"cold_start": 100.0}):
+            with self.subTest(baseline=baseline):
+                report = self.report(baseline)
+                self.assertIn("Regression Analysis", report)
+                self.assertIn("nothing compared", report)
+
+    def test_regression_detected(self):
+        report = self.report({"cold_start_ms": 50.0, "unknown_field": 1})
+        self.assertIn("Cold start: 50.00 -> 100.00 (+100.0%)", report)
+
+
+if __name__ == "__main__":
+    unittest.main()